@@ -1,73 +1,167 @@
 """
 Authentication helpers: password hashing and session management.
 """
+import asyncio
 import hashlib
+import hmac
+import json
 import secrets
-from fastapi import Request, Response
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
+from email_validator import validate_email, EmailNotValidError
+from fastapi import HTTPException, Request, Response
 from datetime import datetime, timedelta
+from app.env_cache import get_setting
+
+# Argon2id hasher; the encoded hash embeds its own salt and parameters
+_ph = PasswordHasher(time_cost=2, memory_cost=65536, parallelism=1)
 
 
 def hash_password(password: str) -> str:
     """
-    Hash a password using SHA-256 with salt.
-    For production, consider using bcrypt or argon2.
+    Hash a password using Argon2id.
     
     Args:
         password: Plain text password
     
     Returns:
-        str: Hashed password
+        str: Encoded Argon2 hash (includes salt and parameters)
     """
-    salt = secrets.token_hex(16)
-    password_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-    return f"{salt}:{password_hash}"
+    return _ph.hash(password)
 
 
 def verify_password(password: str, password_hash: str) -> bool:
     """
     Verify a password against a hash.
     
+    Accounts created before the Argon2 switch still carry the legacy
+    "salt:hash" SHA-256 format, so those are checked the old way.
+    
     Args:
         password: Plain text password
-        password_hash: Stored password hash (format: "salt:hash")
+        password_hash: Stored password hash (Argon2 or legacy "salt:hash")
     
     Returns:
         bool: True if password matches
     """
+    if not password_hash.startswith("$argon2"):
+        return _verify_legacy_password(password, password_hash)
     try:
-        salt, stored_hash = password_hash.split(":")
-        computed_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-        return computed_hash == stored_hash
-    except ValueError:
+        return _ph.verify(password_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+
+def password_needs_rehash(password_hash: str) -> bool:
+    """
+    Check whether a stored hash should be replaced after a successful login.
+    
+    Args:
+        password_hash: Stored password hash (Argon2 or legacy "salt:hash")
+    
+    Returns:
+        bool: True for legacy hashes and Argon2 hashes with outdated parameters
+    """
+    if not password_hash.startswith("$argon2"):
+        return True
+    return _ph.check_needs_rehash(password_hash)
+
+
+def _verify_legacy_password(password: str, password_hash: str) -> bool:
+    """Verify a legacy "salt:hash" SHA-256 password hash in constant time."""
+    salt, sep, stored_hash = password_hash.partition(":")
+    if not sep:
         return False
+    computed_hash = hashlib.sha256((password + salt).encode()).hexdigest()
+    return hmac.compare_digest(computed_hash, stored_hash)
+
+
+def normalize_email(email: str):
+    """
+    Validate an email address and return its normalized form.
+    
+    Normalizing (trimmed, lowercase domain) on every write and lookup keeps
+    "Foo@X.com" and "Foo@x.com" from becoming two different accounts.
+    
+    Args:
+        email: Email address as entered by the user
+    
+    Returns:
+        str: Normalized email, or None if the address is invalid
+    """
+    try:
+        return validate_email(email, check_deliverability=False).normalized
+    except EmailNotValidError:
+        return None
+
+
+# Sessions expire after 24 hours
+SESSION_TTL_SECONDS = 86400
 
+# How often the in-memory store is swept for expired sessions
+SESSION_SWEEP_INTERVAL_SECONDS = 300
+
+# Sessions live in Redis when REDIS_URL is set, so they are shared across
+# uvicorn workers and expired by Redis itself. Without it, fall back to a
+# simple in-memory store (fine for a single local process).
+REDIS_URL = get_setting("REDIS_URL")
+
+if REDIS_URL:
+    from redis import asyncio as aioredis
+    _redis = aioredis.Redis(
+        connection_pool=aioredis.ConnectionPool.from_url(REDIS_URL, max_connections=50)
+    )
+else:
+    _redis = None
 
-# Simple in-memory session store (for demo purposes)
-# In production, use Redis or database-backed sessions
 sessions = {}
 
 
-def create_session(user_id: int, role: str) -> str:
+def _session_key(session_token: str) -> str:
+    """Redis key for a session token."""
+    return f"sess:{session_token}"
+
+
+async def create_session(user_id: int, role: str, email: str, created_at: datetime = None) -> str:
     """
     Create a new session for a user.
     
+    The user's email and signup time are cached on the session so protected
+    pages don't need to look the user up again on every request.
+    
     Args:
         user_id: User ID
         role: User role
+        email: User email
+        created_at: When the user registered
     
     Returns:
         str: Session token
     """
     session_token = secrets.token_urlsafe(32)
-    sessions[session_token] = {
-        "user_id": user_id,
-        "role": role,
-        "created_at": datetime.now()
-    }
+    if _redis is not None:
+        await _redis.setex(
+            _session_key(session_token),
+            SESSION_TTL_SECONDS,
+            json.dumps({
+                "user_id": user_id,
+                "role": role,
+                "email": email,
+                "user_created_at": created_at.isoformat() if created_at else None
+            })
+        )
+    else:
+        sessions[session_token] = {
+            "user_id": user_id,
+            "role": role,
+            "email": email,
+            "user_created_at": created_at,
+            "created_at": datetime.now()
+        }
     return session_token
 
 
-def get_session(session_token: str):
+async def get_session(session_token: str):
     """
     Get session data by token.
     
@@ -77,10 +171,19 @@ def get_session(session_token: str):
     Returns:
         dict: Session data or None if invalid
     """
+    if _redis is not None:
+        data = await _redis.get(_session_key(session_token))
+        if not data:
+            return None
+        session = json.loads(data)
+        if session.get("user_created_at"):
+            session["user_created_at"] = datetime.fromisoformat(session["user_created_at"])
+        return session
+
     if session_token in sessions:
         session = sessions[session_token]
         # Check if session is expired (24 hours)
-        if datetime.now() - session["created_at"] < timedelta(hours=24):
+        if datetime.now() - session["created_at"] < timedelta(seconds=SESSION_TTL_SECONDS):
             return session
         else:
             # Session expired, remove it
@@ -88,18 +191,46 @@ def get_session(session_token: str):
     return None
 
 
-def delete_session(session_token: str):
+async def delete_session(session_token: str):
     """
     Delete a session.
     
     Args:
         session_token: Session token
     """
-    if session_token in sessions:
+    if _redis is not None:
+        await _redis.delete(_session_key(session_token))
+    elif session_token in sessions:
         del sessions[session_token]
 
 
-def get_current_user(request: Request):
+def sweep_expired_sessions():
+    """
+    Remove expired sessions from the in-memory store.
+    
+    Tokens that are never looked up again (e.g. the browser was closed
+    without logging out) would otherwise stay in memory forever.
+    
+    Returns:
+        int: Number of sessions removed
+    """
+    cutoff = datetime.now() - timedelta(seconds=SESSION_TTL_SECONDS)
+    expired = [token for token, session in sessions.items() if session["created_at"] <= cutoff]
+    for token in expired:
+        sessions.pop(token, None)
+    return len(expired)
+
+
+async def run_session_sweeper():
+    """Periodically sweep expired sessions. Not needed with Redis, which expires keys itself."""
+    if _redis is not None:
+        return
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL_SECONDS)
+        sweep_expired_sessions()
+
+
+async def get_current_user(request: Request):
     """
     Get current user from session cookie.
     
@@ -107,18 +238,43 @@ def get_current_user(request: Request):
         request: FastAPI request object
     
     Returns:
-        dict: User data with 'user_id' and 'role', or None if not logged in
+        dict: User data with 'user_id', 'role', 'email' and 'created_at',
+              or None if not logged in
     """
     session_token = request.cookies.get("session_token")
     if not session_token:
         return None
     
-    session = get_session(session_token)
-    if not session:
+    session = await get_session(session_token)
+    # Sessions from before the profile was cached lack an email; treat as logged out
+    if not session or "email" not in session:
         return None
     
     return {
         "user_id": session["user_id"],
-        "role": session["role"]
+        "role": session["role"],
+        "email": session["email"],
+        "created_at": session.get("user_created_at")
     }
 
+
+async def require_role(request: Request, role: str):
+    """
+    Get the logged-in user for partial endpoints, requiring the given role.
+    
+    Args:
+        request: FastAPI request object
+        role: "doctor" or "patient"
+    
+    Returns:
+        dict: User data, as returned by get_current_user
+    
+    Raises:
+        HTTPException: 401 if not logged in, 403 if the user has another role
+    """
+    user = await get_current_user(request)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not logged in.")
+    if user["role"] != role:
+        raise HTTPException(status_code=403, detail=f"Access denied. {role.capitalize()} role required.")
+    return user
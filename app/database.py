@@ -2,16 +2,12 @@
 Database connection to Supabase PostgreSQL.
 This module handles the connection to Supabase database.
 """
-import os
-import psycopg2
-from psycopg2.extras import RealDictCursor
-from dotenv import load_dotenv
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+from app.env_cache import get_database_url, get_setting
 
-# Load environment variables
-load_dotenv()
-
-# Get database connection string from environment
-DATABASE_URL = os.getenv("DATABASE_URL")
+# Get database connection string from environment (or .env)
+DATABASE_URL = get_database_url()
 
 if not DATABASE_URL:
     raise ValueError(
@@ -19,34 +15,56 @@ if not DATABASE_URL:
         "Please create a .env file with your Supabase connection string."
     )
 
+# Connections per process. With several uvicorn workers, keep
+# workers x DB_POOL_MAX_SIZE under the Supabase project's connection limit.
+DB_POOL_MIN_SIZE = int(get_setting("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(get_setting("DB_POOL_MAX_SIZE", "10"))
 
-def get_db_connection():
-    """
-    Create and return a database connection.
-    
-    Returns:
-        psycopg2.connection: Database connection object
-    """
-    try:
-        conn = psycopg2.connect(DATABASE_URL)
-        return conn
-    except psycopg2.Error as e:
-        print(f"Error connecting to database: {e}")
-        raise
+# created_at is a TIMESTAMPTZ, which psycopg returns in the session's
+# TimeZone. Pin it so dashboard times show in local time instead of the
+# server default (UTC on Supabase).
+APP_TIMEZONE = get_setting("APP_TIMEZONE", "UTC")
+
+# Shared async connection pool so requests reuse open connections instead of
+# paying the TCP + TLS + auth handshake to Supabase every time, without
+# blocking the event loop while a query waits on the network.
+# The pool belongs to one process: every uvicorn worker opens its own, so a
+# deployment can hold up to (workers x max_size) connections to Supabase.
+# Rows come back as dicts, and statements executed more than a few times
+# on a connection are prepared server-side automatically.
+# The pool is opened on application startup (see app.main).
+_pool = AsyncConnectionPool(
+    DATABASE_URL,
+    min_size=DB_POOL_MIN_SIZE,
+    max_size=DB_POOL_MAX_SIZE,
+    kwargs={
+        "prepare_threshold": 3,
+        "row_factory": dict_row,
+        "options": f"-c TimeZone={APP_TIMEZONE}",
+    },
+    open=False,
+)
 
 
-def get_db_cursor(conn=None):
+async def open_db_pool():
+    """Open the connection pool. Must be called from a running event loop."""
+    await _pool.open()
+
+
+async def close_db_pool():
+    """Close the connection pool and all its connections."""
+    await _pool.close()
+
+
+def get_db_connection():
     """
-    Get a database cursor with RealDictCursor (returns dict-like rows).
+    Get a database connection from the pool.
     
-    Args:
-        conn: Optional connection. If None, creates a new one.
+    Use as ``async with get_db_connection() as conn:``. On exit the
+    transaction is committed (or rolled back if an exception was raised)
+    and the connection goes back to the pool.
     
     Returns:
-        tuple: (connection, cursor)
+        Async context manager yielding a psycopg.AsyncConnection
     """
-    if conn is None:
-        conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    return conn, cursor
-
+    return _pool.connection()
@@ -0,0 +1,65 @@
+"""
+Cached access to environment configuration.
+"""
+import os
+from functools import lru_cache
+
+
+def load_env_file(path=".env"):
+    """
+    Load KEY=VALUE lines from a .env file into os.environ.
+    
+    Only the simple form is understood: blank lines and # comments are
+    skipped and surrounding quotes are stripped. Variables that are already
+    set in the environment are left alone.
+    
+    Args:
+        path: Path to the .env file
+    """
+    try:
+        f = open(path)
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#") or "=" not in line:
+                continue
+            key, _, value = line.partition("=")
+            os.environ.setdefault(key.strip(), value.strip().strip('"').strip("'"))
+
+
+@lru_cache(maxsize=None)
+def get_database_url():
+    """
+    Get the database connection string.
+    
+    The .env file is only read when DATABASE_URL isn't already exported,
+    and the result is cached for the life of the process.
+    
+    Returns:
+        str: DATABASE_URL, or None if it isn't configured
+    """
+    if not os.environ.get("DATABASE_URL"):
+        load_env_file()
+    return os.environ.get("DATABASE_URL")
+
+
+@lru_cache(maxsize=None)
+def get_setting(name: str, default=None):
+    """
+    Get an optional configuration value.
+    
+    Like get_database_url, the .env file is only read when the variable
+    isn't already exported, and the result is cached.
+    
+    Args:
+        name: Environment variable name
+        default: Value to return if the variable isn't configured
+    
+    Returns:
+        str: The configured value, or default
+    """
+    if name not in os.environ:
+        load_env_file()
+    return os.environ.get(name, default)
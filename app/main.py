@@ -1,15 +1,28 @@
 """
 FastAPI application entry point.
 """
+import asyncio
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from app.routes import auth, doctor, patient, records
+from app.auth import run_session_sweeper
+from app.database import open_db_pool, close_db_pool
 
 # Create FastAPI app
-app = FastAPI(title="Aarogya Saathi - Medical Records Sharing")
+# JSON endpoints (/health) are serialized with orjson
+app = FastAPI(
+    title="Aarogya Saathi - Medical Records Sharing",
+    default_response_class=ORJSONResponse
+)
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# Compress HTML/CSS/JSON responses; tiny responses aren't worth it
+app.add_middleware(GZipMiddleware, minimum_size=500)
+
+# Mount static files (served with ETag/Last-Modified, so browsers revalidate
+# with a cheap 304 instead of re-downloading)
+app.mount("/static", StaticFiles(directory="app/static", html=False), name="static")
 
 # Include routers
 app.include_router(auth.router)
@@ -17,6 +30,29 @@ app.include_router(doctor.router)
 app.include_router(patient.router)
 app.include_router(records.router)
 
+# Keep a reference so the background task isn't garbage collected
+_background_tasks = set()
+
+
+@app.on_event("startup")
+async def open_database():
+    """Open the database connection pool."""
+    await open_db_pool()
+
+
+@app.on_event("shutdown")
+async def close_database():
+    """Close the database connection pool."""
+    await close_db_pool()
+
+
+@app.on_event("startup")
+async def start_session_sweeper():
+    """Start the background sweep of expired in-memory sessions."""
+    task = asyncio.create_task(run_session_sweeper())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
 
 @app.get("/health")
 async def health_check():
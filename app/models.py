@@ -2,11 +2,62 @@
 Data models and database queries.
 This module contains all database operations.
 """
-from app.database import get_db_connection, get_db_cursor
-from datetime import datetime
+from app.database import get_db_connection
 
+# Number of medical records shown per dashboard page
+RECORDS_PAGE_SIZE = 50
 
-def create_user(email: str, password_hash: str, role: str):
+# 1-character search terms match almost every user, so they're skipped to
+# avoid huge result sets (the trigram index needs 3+ characters to help)
+MIN_SEARCH_LENGTH = 2
+
+_USER_BY_ID_SQL = "SELECT id, email, role, created_at FROM users WHERE id = %s"
+
+_RECORDS_BY_DOCTOR_SQL = """
+    SELECT 
+        mr.id, 
+        mr.title, 
+        mr.notes, 
+        mr.created_at,
+        mr.patient_id,
+        u.email as patient_email
+    FROM medical_records mr
+    JOIN users u ON mr.patient_id = u.id
+    WHERE mr.doctor_id = %s
+    ORDER BY mr.created_at DESC
+    LIMIT %s OFFSET %s
+"""
+
+_RECORDS_BY_PATIENT_SQL = """
+    SELECT 
+        mr.id, 
+        mr.title, 
+        mr.notes, 
+        mr.created_at,
+        mr.doctor_id,
+        u.email as doctor_email
+    FROM medical_records mr
+    JOIN users u ON mr.doctor_id = u.id
+    WHERE mr.patient_id = %s
+    ORDER BY mr.created_at DESC
+    LIMIT %s OFFSET %s
+"""
+
+
+_DOCTOR_STATS_SQL = """
+    SELECT COUNT(*) AS total_records, COUNT(DISTINCT patient_id) AS unique_patients
+    FROM medical_records
+    WHERE doctor_id = %s
+"""
+
+_PATIENT_STATS_SQL = """
+    SELECT COUNT(*) AS total_records, COUNT(DISTINCT doctor_id) AS unique_doctors
+    FROM medical_records
+    WHERE patient_id = %s
+"""
+
+
+async def create_user(email: str, password_hash: str, role: str):
     """
     Create a new user in the database.
     
@@ -18,31 +69,21 @@ def create_user(email: str, password_hash: str, role: str):
     Returns:
         dict: Created user data or None if email already exists
     """
-    conn, cursor = get_db_cursor()
-    try:
-        cursor.execute(
+    async with get_db_connection() as conn, conn.cursor() as cursor:
+        await cursor.execute(
             """
-            INSERT INTO users (email, password_hash, role, created_at)
-            VALUES (%s, %s, %s, %s)
+            INSERT INTO users (email, password_hash, role)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (email) DO NOTHING
             RETURNING id, email, role, created_at
             """,
-            (email, password_hash, role, datetime.now())
+            (email, password_hash, role)
         )
-        user = cursor.fetchone()
-        conn.commit()
-        return dict(user) if user else None
-    except Exception as e:
-        conn.rollback()
-        # Check if it's a unique constraint violation
-        if "unique" in str(e).lower() or "duplicate" in str(e).lower():
-            return None  # Email already exists
-        raise
-    finally:
-        cursor.close()
-        conn.close()
-
-
-def get_user_by_email(email: str):
+        # No row comes back when the email already exists
+        return await cursor.fetchone()
+
+
+async def get_user_by_email(email: str):
     """
     Get user by email.
     
@@ -52,20 +93,33 @@ def get_user_by_email(email: str):
     Returns:
         dict: User data or None if not found
     """
-    conn, cursor = get_db_cursor()
-    try:
-        cursor.execute(
+    async with get_db_connection() as conn, conn.cursor() as cursor:
+        # Hot path (every login): prepare on first use instead of waiting
+        # for the pool's prepare_threshold
+        await cursor.execute(
             "SELECT id, email, password_hash, role, created_at FROM users WHERE email = %s",
-            (email,)
+            (email,),
+            prepare=True
         )
-        user = cursor.fetchone()
-        return dict(user) if user else None
-    finally:
-        cursor.close()
-        conn.close()
+        return await cursor.fetchone()
 
 
-def get_user_by_id(user_id: int):
+async def update_password_hash(user_id: int, password_hash: str):
+    """
+    Replace a user's stored password hash.
+    
+    Args:
+        user_id: User ID
+        password_hash: New hashed password
+    """
+    async with get_db_connection() as conn, conn.cursor() as cursor:
+        await cursor.execute(
+            "UPDATE users SET password_hash = %s WHERE id = %s",
+            (password_hash, user_id)
+        )
+
+
+async def get_user_by_id(user_id: int):
     """
     Get user by ID.
     
@@ -75,124 +129,124 @@ def get_user_by_id(user_id: int):
     Returns:
         dict: User data or None if not found
     """
-    conn, cursor = get_db_cursor()
-    try:
-        cursor.execute(
-            "SELECT id, email, role, created_at FROM users WHERE id = %s",
-            (user_id,)
-        )
-        user = cursor.fetchone()
-        return dict(user) if user else None
-    finally:
-        cursor.close()
-        conn.close()
+    async with get_db_connection() as conn, conn.cursor() as cursor:
+        await cursor.execute(_USER_BY_ID_SQL, (user_id,))
+        return await cursor.fetchone()
 
 
-def create_medical_record(doctor_id: int, patient_id: int, title: str, notes: str):
+async def create_medical_record_by_email(doctor_id: int, patient_email: str, title: str, notes: str):
     """
-    Create a new medical record.
+    Create a new medical record for the patient with the given email.
+    
+    The patient lookup and the insert happen in a single statement.
     
     Args:
         doctor_id: ID of the doctor creating the record
-        patient_id: ID of the patient
+        patient_email: Email of the patient
         title: Record title
         notes: Record notes
     
     Returns:
-        dict: Created record data
+        dict: Created record data, or None if no patient has that email
     """
-    conn, cursor = get_db_cursor()
-    try:
-        cursor.execute(
+    async with get_db_connection() as conn, conn.cursor() as cursor:
+        await cursor.execute(
             """
-            INSERT INTO medical_records (doctor_id, patient_id, title, notes, created_at)
-            VALUES (%s, %s, %s, %s, %s)
+            WITH p AS (
+                SELECT id FROM users WHERE email = %s AND role = 'patient'
+            )
+            INSERT INTO medical_records (doctor_id, patient_id, title, notes)
+            SELECT %s, p.id, %s, %s FROM p
             RETURNING id, doctor_id, patient_id, title, notes, created_at
             """,
-            (doctor_id, patient_id, title, notes, datetime.now())
+            (patient_email, doctor_id, title, notes)
         )
-        record = cursor.fetchone()
-        conn.commit()
-        return dict(record) if record else None
-    except Exception as e:
-        conn.rollback()
-        raise
-    finally:
-        cursor.close()
-        conn.close()
-
-
-def get_records_by_doctor(doctor_id: int):
+        return await cursor.fetchone()
+
+
+async def get_records_by_doctor(doctor_id: int, limit: int = RECORDS_PAGE_SIZE, offset: int = 0):
     """
-    Get all medical records created by a doctor.
+    Get one page of medical records created by a doctor, newest first.
     
     Args:
         doctor_id: Doctor ID
+        limit: Maximum number of records to return
+        offset: Number of records to skip
     
     Returns:
         list: List of medical records with patient info
     """
-    conn, cursor = get_db_cursor()
-    try:
-        cursor.execute(
-            """
-            SELECT 
-                mr.id, 
-                mr.title, 
-                mr.notes, 
-                mr.created_at,
-                mr.patient_id,
-                u.email as patient_email
-            FROM medical_records mr
-            JOIN users u ON mr.patient_id = u.id
-            WHERE mr.doctor_id = %s
-            ORDER BY mr.created_at DESC
-            """,
-            (doctor_id,)
-        )
-        records = cursor.fetchall()
-        return [dict(record) for record in records]
-    finally:
-        cursor.close()
-        conn.close()
+    async with get_db_connection() as conn, conn.cursor() as cursor:
+        await cursor.execute(_RECORDS_BY_DOCTOR_SQL, (doctor_id, limit, offset))
+        return await cursor.fetchall()
 
 
-def get_records_by_patient(patient_id: int):
+async def get_records_by_patient(patient_id: int, limit: int = RECORDS_PAGE_SIZE, offset: int = 0):
     """
-    Get all medical records for a patient.
+    Get one page of medical records for a patient, newest first.
     
     Args:
         patient_id: Patient ID
+        limit: Maximum number of records to return
+        offset: Number of records to skip
     
     Returns:
         list: List of medical records with doctor info
     """
-    conn, cursor = get_db_cursor()
-    try:
-        cursor.execute(
-            """
-            SELECT 
-                mr.id, 
-                mr.title, 
-                mr.notes, 
-                mr.created_at,
-                mr.doctor_id,
-                u.email as doctor_email
-            FROM medical_records mr
-            JOIN users u ON mr.doctor_id = u.id
-            WHERE mr.patient_id = %s
-            ORDER BY mr.created_at DESC
-            """,
-            (patient_id,)
-        )
-        records = cursor.fetchall()
-        return [dict(record) for record in records]
-    finally:
-        cursor.close()
-        conn.close()
+    async with get_db_connection() as conn, conn.cursor() as cursor:
+        await cursor.execute(_RECORDS_BY_PATIENT_SQL, (patient_id, limit, offset))
+        return await cursor.fetchall()
+
+
+async def get_doctor_dashboard_data(doctor_id: int, limit: int = RECORDS_PAGE_SIZE, offset: int = 0):
+    """
+    Get the doctor dashboard's stats and records in a single pipelined round-trip.
+    
+    The doctor's profile is not fetched here; it is cached on the session.
+    
+    Args:
+        doctor_id: Doctor ID
+        limit: Maximum number of records to return
+        offset: Number of records to skip
+    
+    Returns:
+        tuple: (dict with 'total_records' and 'unique_patients',
+                one page of medical records)
+    """
+    async with get_db_connection() as conn:
+        async with conn.pipeline():
+            stats_cursor = await conn.execute(_DOCTOR_STATS_SQL, (doctor_id,))
+            records_cursor = await conn.execute(
+                _RECORDS_BY_DOCTOR_SQL, (doctor_id, limit, offset)
+            )
+        return await stats_cursor.fetchone(), await records_cursor.fetchall()
+
+
+async def get_patient_dashboard_data(patient_id: int, limit: int = RECORDS_PAGE_SIZE, offset: int = 0):
+    """
+    Get the patient dashboard's stats and records in a single pipelined round-trip.
+    
+    The patient's profile is not fetched here; it is cached on the session.
+    
+    Args:
+        patient_id: Patient ID
+        limit: Maximum number of records to return
+        offset: Number of records to skip
+    
+    Returns:
+        tuple: (dict with 'total_records' and 'unique_doctors',
+                one page of medical records)
+    """
+    async with get_db_connection() as conn:
+        async with conn.pipeline():
+            stats_cursor = await conn.execute(_PATIENT_STATS_SQL, (patient_id,))
+            records_cursor = await conn.execute(
+                _RECORDS_BY_PATIENT_SQL, (patient_id, limit, offset)
+            )
+        return await stats_cursor.fetchone(), await records_cursor.fetchall()
 
 
-def search_patients(search_term: str, limit: int = 20):
+async def search_patients(search_term: str, limit: int = 20):
     """
     Search for patients by email (partial match).
     
@@ -203,9 +257,8 @@ def search_patients(search_term: str, limit: int = 20):
     Returns:
         list: List of patient users matching the search term
     """
-    conn, cursor = get_db_cursor()
-    try:
-        cursor.execute(
+    async with get_db_connection() as conn, conn.cursor() as cursor:
+        await cursor.execute(
             """
             SELECT id, email, role, created_at
             FROM users
@@ -215,14 +268,10 @@ def search_patients(search_term: str, limit: int = 20):
             """,
             (f"%{search_term}%", limit)
         )
-        patients = cursor.fetchall()
-        return [dict(patient) for patient in patients]
-    finally:
-        cursor.close()
-        conn.close()
+        return await cursor.fetchall()
 
 
-def get_all_patients(limit: int = 100):
+async def get_all_patients(limit: int = 100):
     """
     Get all patients.
     
@@ -232,9 +281,8 @@ def get_all_patients(limit: int = 100):
     Returns:
         list: List of all patient users
     """
-    conn, cursor = get_db_cursor()
-    try:
-        cursor.execute(
+    async with get_db_connection() as conn, conn.cursor() as cursor:
+        await cursor.execute(
             """
             SELECT id, email, role, created_at
             FROM users
@@ -244,14 +292,10 @@ def get_all_patients(limit: int = 100):
             """,
             (limit,)
         )
-        patients = cursor.fetchall()
-        return [dict(patient) for patient in patients]
-    finally:
-        cursor.close()
-        conn.close()
+        return await cursor.fetchall()
 
 
-def get_patient_record_count(patient_id: int, doctor_id: int):
+async def get_patient_record_count(patient_id: int, doctor_id: int):
     """
     Get count of records for a specific patient by a specific doctor.
     
@@ -262,9 +306,8 @@ def get_patient_record_count(patient_id: int, doctor_id: int):
     Returns:
         int: Number of records
     """
-    conn, cursor = get_db_cursor()
-    try:
-        cursor.execute(
+    async with get_db_connection() as conn, conn.cursor() as cursor:
+        await cursor.execute(
             """
             SELECT COUNT(*) as count
             FROM medical_records
@@ -272,14 +315,11 @@ def get_patient_record_count(patient_id: int, doctor_id: int):
             """,
             (patient_id, doctor_id)
         )
-        result = cursor.fetchone()
+        result = await cursor.fetchone()
         return result['count'] if result else 0
-    finally:
-        cursor.close()
-        conn.close()
 
 
-def search_doctors(search_term: str, limit: int = 20):
+async def search_doctors(search_term: str, limit: int = 20):
     """
     Search for doctors by email (partial match).
     
@@ -290,9 +330,8 @@ def search_doctors(search_term: str, limit: int = 20):
     Returns:
         list: List of doctor users matching the search term
     """
-    conn, cursor = get_db_cursor()
-    try:
-        cursor.execute(
+    async with get_db_connection() as conn, conn.cursor() as cursor:
+        await cursor.execute(
             """
             SELECT id, email, role, created_at
             FROM users
@@ -302,14 +341,10 @@ def search_doctors(search_term: str, limit: int = 20):
             """,
             (f"%{search_term}%", limit)
         )
-        doctors = cursor.fetchall()
-        return [dict(doctor) for doctor in doctors]
-    finally:
-        cursor.close()
-        conn.close()
+        return await cursor.fetchall()
 
 
-def get_doctors_visited_by_patient(patient_id: int):
+async def get_doctors_visited_by_patient(patient_id: int):
     """
     Get all unique doctors that a patient has visited (doctors who have created records for this patient).
     
@@ -319,9 +354,8 @@ def get_doctors_visited_by_patient(patient_id: int):
     Returns:
         list: List of unique doctor users that the patient has visited
     """
-    conn, cursor = get_db_cursor()
-    try:
-        cursor.execute(
+    async with get_db_connection() as conn, conn.cursor() as cursor:
+        await cursor.execute(
             """
             SELECT DISTINCT u.id, u.email, u.role, u.created_at
             FROM users u
@@ -331,8 +365,4 @@ def get_doctors_visited_by_patient(patient_id: int):
             """,
             (patient_id,)
         )
-        doctors = cursor.fetchall()
-        return [dict(doctor) for doctor in doctors]
-    finally:
-        cursor.close()
-        conn.close()
\ No newline at end of file
+        return await cursor.fetchall()
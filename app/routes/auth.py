@@ -3,22 +3,14 @@ Authentication routes: registration and login.
 """
 from fastapi import APIRouter, Request, Response, Form, HTTPException
 from fastapi.responses import RedirectResponse, HTMLResponse
-from jinja2 import Template
-from pathlib import Path
-from app.models import create_user, get_user_by_email
-from app.auth import hash_password, verify_password, create_session
+from starlette.concurrency import run_in_threadpool
+from app.models import create_user, get_user_by_email, update_password_hash
+from app.templating import render_template
+from app.auth import hash_password, verify_password, password_needs_rehash, create_session, normalize_email
 
 router = APIRouter()
-TEMPLATES_DIR = Path("app/templates")
 
 
-def render_template(template_name: str, context: dict) -> str:
-    """Render a Jinja2 template."""
-    template_path = TEMPLATES_DIR / template_name
-    with open(template_path, "r", encoding="utf-8") as f:
-        template = Template(f.read())
-    return template.render(**context)
-
 @router.get("/", response_class=HTMLResponse)
 async def landing_page(request: Request):
     """Landing page with login/register options."""
@@ -50,8 +42,9 @@ async def register(
         html = render_template("register.html", {"request": request, "error": "Invalid role. Must be 'doctor' or 'patient'."})
         return HTMLResponse(content=html, status_code=400)
     
-    # Validate email format (basic)
-    if "@" not in email or "." not in email:
+    # Validate and normalize email
+    email = normalize_email(email)
+    if email is None:
         html = render_template("register.html", {"request": request, "error": "Invalid email format."})
         return HTMLResponse(content=html, status_code=400)
     
@@ -60,11 +53,11 @@ async def register(
         html = render_template("register.html", {"request": request, "error": "Password must be at least 6 characters."})
         return HTMLResponse(content=html, status_code=400)
     
-    # Hash password
-    password_hash = hash_password(password)
+    # Hash password (Argon2 is CPU-heavy, keep it off the event loop)
+    password_hash = await run_in_threadpool(hash_password, password)
     
     # Create user
-    user = create_user(email, password_hash, role)
+    user = await create_user(email, password_hash, role)
     
     if user is None:
         # Email already exists
@@ -97,20 +90,29 @@ async def login(
     
     Verifies credentials and creates session.
     """
-    # Get user by email
-    user = get_user_by_email(email)
+    # Get user by email (stored emails are normalized at registration)
+    normalized = normalize_email(email)
+    user = await get_user_by_email(normalized or email)
+    if user is None and normalized and normalized != email:
+        # Older accounts may predate normalization (see migrations/004)
+        user = await get_user_by_email(email)
     
     if not user:
         html = render_template("login.html", {"request": request, "error": "Invalid email or password."})
         return HTMLResponse(content=html, status_code=401)
     
     # Verify password
-    if not verify_password(password, user["password_hash"]):
+    if not await run_in_threadpool(verify_password, password, user["password_hash"]):
         html = render_template("login.html", {"request": request, "error": "Invalid email or password."})
         return HTMLResponse(content=html, status_code=401)
     
+    # Upgrade legacy SHA-256 (or outdated Argon2) hashes now that we have the password
+    if password_needs_rehash(user["password_hash"]):
+        new_hash = await run_in_threadpool(hash_password, password)
+        await update_password_hash(user["id"], new_hash)
+    
     # Create session
-    session_token = create_session(user["id"], user["role"])
+    session_token = await create_session(user["id"], user["role"], user["email"], user["created_at"])
     
     # Set session cookie
     response = RedirectResponse(url=f"/{user['role']}/dashboard", status_code=303)
@@ -131,7 +133,7 @@ async def logout(request: Request, response: Response):
     session_token = request.cookies.get("session_token")
     if session_token:
         from app.auth import delete_session
-        delete_session(session_token)
+        await delete_session(session_token)
     
     response = RedirectResponse(url="/", status_code=303)
     response.delete_cookie("session_token")
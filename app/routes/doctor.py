@@ -3,60 +3,63 @@ Doctor dashboard and routes.
 """
 from fastapi import APIRouter, Request, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse
-from jinja2 import Template
-from pathlib import Path
-from app.auth import get_current_user
+from app.templating import render_template
+from app.auth import get_current_user, require_role
+from app.routes.pagination import get_page
 from app.models import (
-    get_user_by_id, 
-    get_records_by_doctor, 
+    RECORDS_PAGE_SIZE,
+    MIN_SEARCH_LENGTH,
+    get_doctor_dashboard_data,
+    get_records_by_doctor,
     search_patients, 
     get_all_patients,
     get_patient_record_count
 )
 
 router = APIRouter()
-TEMPLATES_DIR = Path("app/templates")
-
-def render_template(template_name: str, context: dict) -> str:
-    """Render a Jinja2 template."""
-    template_path = TEMPLATES_DIR / template_name
-    with open(template_path, "r", encoding="utf-8") as f:
-        template = Template(f.read())
-    return template.render(**context)
 
 
 @router.get("/doctor/dashboard", response_class=HTMLResponse)
 async def doctor_dashboard(request: Request):
     """Doctor dashboard showing doctor info and their records."""
     # Check authentication
-    user = get_current_user(request)
+    user = await get_current_user(request)
     if not user:
         return RedirectResponse(url="/login", status_code=303)
     
     if user["role"] != "doctor":
         raise HTTPException(status_code=403, detail="Access denied. Doctor role required.")
     
-    # Get doctor info
-    doctor = get_user_by_id(user["user_id"])
+    page = get_page(request)
+    
+    # Doctor info is cached on the session at login
+    doctor = {
+        "id": user["user_id"],
+        "email": user["email"],
+        "role": user["role"],
+        "created_at": user["created_at"]
+    }
     
-    # Get doctor's records
-    records = get_records_by_doctor(user["user_id"])
+    # Get stats and one page of records in one round-trip
+    stats, records = await get_doctor_dashboard_data(
+        user["user_id"], limit=RECORDS_PAGE_SIZE, offset=page * RECORDS_PAGE_SIZE
+    )
     
     # Get query params
     created = request.query_params.get("created")
     view = request.query_params.get("view", "overview")  # overview, patients, records, search
     
     # Get search query if in search view
-    search_query = request.query_params.get("q", "")
+    search_query = request.query_params.get("q", "").strip()
     search_results = []
-    if view == "search" and search_query:
-        search_results = search_patients(search_query)
+    if view == "search" and len(search_query) >= MIN_SEARCH_LENGTH:
+        search_results = await search_patients(search_query)
     elif view == "patients":
-        search_results = get_all_patients()
+        search_results = await get_all_patients()
     
-    # Calculate stats
-    total_records = len(records)
-    unique_patients = len(set(record["patient_id"] for record in records))
+    # Stats are aggregated by the database
+    total_records = stats["total_records"]
+    unique_patients = stats["unique_patients"]
     
     html = render_template(
         "doctor_dashboard.html",
@@ -68,10 +71,51 @@ async def doctor_dashboard(request: Request):
             "view": view,
             "search_query": search_query,
             "search_results": search_results,
+            "min_search_length": MIN_SEARCH_LENGTH,
             "total_records": total_records,
+            "page": page,
+            "has_next_page": (page + 1) * RECORDS_PAGE_SIZE < total_records,
             "unique_patients": unique_patients,
             "doctor_id": user["user_id"]
         }
     )
     return HTMLResponse(content=html)
 
+
+@router.get("/doctor/_records", response_class=HTMLResponse)
+async def doctor_records_partial(request: Request):
+    """One page of the doctor's records, rendered as an HTML fragment."""
+    user = await require_role(request, "doctor")
+    page = get_page(request)
+    # One extra row tells us whether there is a next page without counting
+    records = await get_records_by_doctor(
+        user["user_id"], limit=RECORDS_PAGE_SIZE + 1, offset=page * RECORDS_PAGE_SIZE
+    )
+    html = render_template(
+        "_doctor_records.html",
+        {
+            "records": records[:RECORDS_PAGE_SIZE],
+            "page": page,
+            "has_next_page": len(records) > RECORDS_PAGE_SIZE
+        }
+    )
+    return HTMLResponse(content=html)
+
+
+@router.get("/doctor/_search", response_class=HTMLResponse)
+async def doctor_search_partial(request: Request):
+    """Patient search results, rendered as an HTML fragment."""
+    await require_role(request, "doctor")
+    search_query = request.query_params.get("q", "").strip()
+    search_results = []
+    if len(search_query) >= MIN_SEARCH_LENGTH:
+        search_results = await search_patients(search_query)
+    html = render_template(
+        "_doctor_search_results.html",
+        {
+            "search_query": search_query,
+            "search_results": search_results,
+            "min_search_length": MIN_SEARCH_LENGTH
+        }
+    )
+    return HTMLResponse(content=html)
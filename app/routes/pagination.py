@@ -0,0 +1,12 @@
+"""
+Pagination helpers shared by the dashboard routes.
+"""
+from fastapi import Request
+
+
+def get_page(request: Request) -> int:
+    """Read the records page number from the query string (starts at 0)."""
+    try:
+        return max(int(request.query_params.get("page", 0)), 0)
+    except ValueError:
+        return 0
@@ -3,27 +3,18 @@ Medical records routes: create and view records.
 """
 from fastapi import APIRouter, Request, Form, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse
-from jinja2 import Template
-from pathlib import Path
-from app.auth import get_current_user
-from app.models import get_user_by_email, create_medical_record, get_user_by_id
+from app.templating import render_template
+from app.auth import get_current_user, normalize_email
+from app.models import create_medical_record_by_email, get_user_by_id
 
 router = APIRouter()
-TEMPLATES_DIR = Path("app/templates")
-
-def render_template(template_name: str, context: dict) -> str:
-    """Render a Jinja2 template."""
-    template_path = TEMPLATES_DIR / template_name
-    with open(template_path, "r", encoding="utf-8") as f:
-        template = Template(f.read())
-    return template.render(**context)
 
 
 @router.get("/records/create", response_class=HTMLResponse)
 async def create_record_page(request: Request):
     """Page to create a new medical record (doctors only)."""
     # Check authentication
-    user = get_current_user(request)
+    user = await get_current_user(request)
     if not user:
         return RedirectResponse(url="/login", status_code=303)
     
@@ -35,7 +26,7 @@ async def create_record_page(request: Request):
     patient_email = None
     if patient_id:
         try:
-            patient = get_user_by_id(int(patient_id))
+            patient = await get_user_by_id(int(patient_id))
             if patient and patient["role"] == "patient":
                 patient_email = patient["email"]
         except (ValueError, TypeError):
@@ -61,7 +52,7 @@ async def create_record(
     Only doctors can create records.
     """
     # Check authentication
-    user = get_current_user(request)
+    user = await get_current_user(request)
     if not user:
         return RedirectResponse(url="/login", status_code=303)
     
@@ -73,26 +64,29 @@ async def create_record(
         html = render_template("create_record.html", {"request": request, "error": "Title is required."})
         return HTMLResponse(content=html, status_code=400)
     
-    # Find patient by email
-    patient = get_user_by_email(patient_email)
-    if not patient:
-        html = render_template("create_record.html", {"request": request, "error": f"Patient with email '{patient_email}' not found."})
-        return HTMLResponse(content=html, status_code=404)
-    
-    if patient["role"] != "patient":
-        html = render_template("create_record.html", {"request": request, "error": f"User '{patient_email}' is not a patient."})
-        return HTMLResponse(content=html, status_code=400)
-    
-    # Create record
+    # Create record; the patient is looked up by email in the same query
+    normalized = normalize_email(patient_email)
     try:
-        create_medical_record(
+        record = await create_medical_record_by_email(
             doctor_id=user["user_id"],
-            patient_id=patient["id"],
+            patient_email=normalized or patient_email,
             title=title.strip(),
             notes=notes.strip() if notes else ""
         )
-        return RedirectResponse(url="/doctor/dashboard?created=1", status_code=303)
+        if record is None and normalized and normalized != patient_email:
+            # Older accounts may predate normalization (see migrations/004)
+            record = await create_medical_record_by_email(
+                doctor_id=user["user_id"],
+                patient_email=patient_email,
+                title=title.strip(),
+                notes=notes.strip() if notes else ""
+            )
     except Exception as e:
         html = render_template("create_record.html", {"request": request, "error": f"Error creating record: {str(e)}"})
         return HTMLResponse(content=html, status_code=500)
-
+    
+    if record is None:
+        html = render_template("create_record.html", {"request": request, "error": f"Patient with email '{patient_email}' not found."})
+        return HTMLResponse(content=html, status_code=404)
+    
+    return RedirectResponse(url="/doctor/dashboard?created=1", status_code=303)
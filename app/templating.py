@@ -0,0 +1,18 @@
+"""
+Jinja2 template rendering shared by all routes.
+"""
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+# A single environment caches compiled templates by name, so each template
+# is read and parsed once per process instead of on every request.
+_env = Environment(
+    loader=FileSystemLoader("app/templates"),
+    autoescape=select_autoescape(["html"]),
+    auto_reload=False,
+    cache_size=400,
+)
+
+
+def render_template(template_name: str, context: dict) -> str:
+    """Render a Jinja2 template."""
+    return _env.get_template(template_name).render(**context)
@@ -0,0 +1,13 @@
+-- Indexes matching the hot dashboard queries.
+-- Safe to re-run: every statement uses IF [NOT] EXISTS.
+-- Email search indexes are in 003_search_trigram_indexes.sql.
+
+-- Records are always filtered by doctor/patient and ordered newest first,
+-- so these composite indexes serve both the filter and the ORDER BY.
+CREATE INDEX IF NOT EXISTS idx_mr_doctor_created ON medical_records (doctor_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_mr_patient_created ON medical_records (patient_id, created_at DESC);
+
+-- Superseded by the composite indexes above
+DROP INDEX IF EXISTS idx_medical_records_doctor_id;
+DROP INDEX IF EXISTS idx_medical_records_patient_id;
+
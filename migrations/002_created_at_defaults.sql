@@ -0,0 +1,29 @@
+-- created_at is set by the database on INSERT instead of by the app.
+-- Only needed for tables created with the old TIMESTAMP columns; run it
+-- once, since re-running it would shift the converted values again.
+--
+-- The app used to write created_at as a naive local datetime.now(), so the
+-- existing values are in the timezone of the machine that ran the app, not
+-- in UTC. Set that zone below before running (e.g. 'Asia/Kolkata', or 'UTC'
+-- if the app ran on a UTC host). The placeholder is not a valid zone, so the
+-- migration fails and rolls back until it is changed.
+
+BEGIN;
+
+SET LOCAL aarogya.legacy_timezone = 'CHANGE_ME';
+
+ALTER TABLE users
+    ALTER COLUMN created_at TYPE TIMESTAMPTZ
+        USING created_at AT TIME ZONE current_setting('aarogya.legacy_timezone'),
+    ALTER COLUMN created_at SET DEFAULT now();
+UPDATE users SET created_at = now() WHERE created_at IS NULL;
+ALTER TABLE users ALTER COLUMN created_at SET NOT NULL;
+
+ALTER TABLE medical_records
+    ALTER COLUMN created_at TYPE TIMESTAMPTZ
+        USING created_at AT TIME ZONE current_setting('aarogya.legacy_timezone'),
+    ALTER COLUMN created_at SET DEFAULT now();
+UPDATE medical_records SET created_at = now() WHERE created_at IS NULL;
+ALTER TABLE medical_records ALTER COLUMN created_at SET NOT NULL;
+
+COMMIT;
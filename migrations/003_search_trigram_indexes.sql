@@ -0,0 +1,7 @@
+-- Email search always filters on one role, so give each role its own
+-- trigram index; ILIKE '%term%' then only scans matching users of that role.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_users_patient_email_trgm ON users USING gin (email gin_trgm_ops) WHERE role = 'patient';
+CREATE INDEX IF NOT EXISTS idx_users_doctor_email_trgm ON users USING gin (email gin_trgm_ops) WHERE role = 'doctor';
+
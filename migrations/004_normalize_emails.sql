@@ -0,0 +1,35 @@
+-- Emails are now normalized (trimmed, lowercase domain) on registration and
+-- looked up in that form. Bring older rows in line so those users still match.
+-- Safe to re-run.
+
+-- Accounts whose emails collide once normalized; these are left unchanged
+-- and need to be merged or renamed by hand. Login still accepts them as typed.
+WITH normalized AS (
+    SELECT id, email,
+           regexp_replace(btrim(email), '@[^@]*$', '')
+               || lower(substring(btrim(email) from '@[^@]*$')) AS normalized_email
+    FROM users
+)
+SELECT normalized_email, array_agg(email ORDER BY id) AS emails
+FROM normalized
+GROUP BY normalized_email
+HAVING COUNT(*) > 1;
+
+-- Normalize every other row
+WITH normalized AS (
+    SELECT id,
+           regexp_replace(btrim(email), '@[^@]*$', '')
+               || lower(substring(btrim(email) from '@[^@]*$')) AS normalized_email
+    FROM users
+),
+unique_normalized AS (
+    SELECT normalized_email
+    FROM normalized
+    GROUP BY normalized_email
+    HAVING COUNT(*) = 1
+)
+UPDATE users u
+SET email = n.normalized_email
+FROM normalized n
+JOIN unique_normalized USING (normalized_email)
+WHERE u.id = n.id AND u.email <> n.normalized_email;
@@ -1,58 +1,138 @@
 """
 Test script to verify Supabase database connection.
 Run this before starting the main application.
+Pass --verbose to list every table in the database.
 """
-import os
-from dotenv import load_dotenv
-from app.database import get_db_connection
-
-# Load environment variables
-load_dotenv()
- 
-try:
-    print("Testing database connection...")
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT version();")
-    version = cursor.fetchone()
-    print(f"[SUCCESS] Connection successful!")
-    print(f"PostgreSQL version: {version[0]}")
-    
-    # Test if tables exist
-    cursor.execute("""
-        SELECT table_name 
-        FROM information_schema.tables 
-        WHERE table_schema = 'public'
-        ORDER BY table_name
-    """)
-    tables = cursor.fetchall()
-    print(f"\n[INFO] Found {len(tables)} tables:")
-    for table in tables:
-        print(f"   - {table[0]}")
+import sys
+
+
+# Output is collected here and written in one go instead of one print() per line
+_output = []
+
+
+def _say(line=""):
+    """Queue a line of output."""
+    _output.append(line)
+
+
+REQUIRED_TABLES = ['users', 'medical_records']
+
+
+def _say_troubleshooting(has_database_url: bool):
+    """Queue the troubleshooting checklist shown when the test fails."""
+    _say("\nTroubleshooting:")
+    if not has_database_url:
+        _say("1. Check your .env file exists and has DATABASE_URL")
+    else:
+        _say("1. DATABASE_URL is set; run python verify_connection_string.py to check its format")
+    _say("2. Verify your password in the connection string")
+    _say("3. Make sure your Supabase project is active (not paused)")
+    _say("4. Check your internet connection")
+    _say("5. Verify the hostname in your connection string is correct")
+    _say("6. Try accessing your Supabase dashboard to ensure project is running")
+
+
+async def check_database(database_url: str, verbose: bool = False) -> bool:
+    """
+    Run the connection and table checks over a single direct connection.
+    
+    Args:
+        database_url: Connection string to test
+        verbose: Also list every table in the public schema
+    
+    Returns:
+        bool: False if the database couldn't be reached
+    """
+    # Imported here so importing this module doesn't load psycopg
+    from psycopg import AsyncConnection, InterfaceError, OperationalError
+    from psycopg.rows import dict_row
+
+    # One direct connection rather than the app's pool: a bad host or
+    # password fails immediately with libpq's own error message.
+    try:
+        conn = await AsyncConnection.connect(database_url, row_factory=dict_row)
+    except (OperationalError, InterfaceError) as e:
+        _say(f"\n[ERROR] Connection failed: {e}")
+        _say_troubleshooting(has_database_url=True)
+        return False
+
+    async with conn:
+        # Send all queries in one round-trip. The probe queries are
+        # prepared server-side so a repeated probe skips parse/plan.
+        async with conn.pipeline():
+            version_cursor = await conn.execute("SELECT version();", prepare=True)
+            # Look the required tables up directly in the catalog cache
+            # rather than scanning the information_schema.tables view
+            required_cursor = await conn.execute(
+                """
+                SELECT name AS table_name
+                FROM unnest(%s::text[]) AS name
+                WHERE to_regclass('public.' || quote_ident(name)) IS NOT NULL
+                """,
+                (REQUIRED_TABLES,),
+                prepare=True
+            )
+            if verbose:
+                tables_cursor = await conn.execute("""
+                    SELECT table_name 
+                    FROM information_schema.tables 
+                    WHERE table_schema = 'public'
+                    ORDER BY table_name
+                """)
+        version = await version_cursor.fetchone()
+        found_tables = {t['table_name'] for t in await required_cursor.fetchall()}
+        tables = await tables_cursor.fetchall() if verbose else None
+    
+    _say(f"[SUCCESS] Connection successful!")
+    _say(f"PostgreSQL version: {version['version']}")
+    
+    if verbose:
+        _say(f"\n[INFO] Found {len(tables)} tables:")
+        for table in tables:
+            _say(f"   - {table['table_name']}")
     
     # Verify required tables exist
-    table_names = [t[0] for t in tables]
-    required_tables = ['users', 'medical_records']
-    missing_tables = [t for t in required_tables if t not in table_names]
+    missing_tables = [t for t in REQUIRED_TABLES if t not in found_tables]
     
     if missing_tables:
-        print(f"\n[WARNING] Missing required tables: {', '.join(missing_tables)}")
-        print("   Please run the SQL queries from SETUP_GUIDE.md Step 4")
+        _say(f"\n[WARNING] Missing required tables: {', '.join(missing_tables)}")
+        _say("   Please run the SQL queries from SETUP_GUIDE.md Step 4")
     else:
-        print("\n[SUCCESS] All required tables exist!")
-    
-    cursor.close()
-    conn.close()
-    print("\n[SUCCESS] Everything is working! You can now run the app with:")
-    print("   uvicorn app.main:app --reload")
-    
-except Exception as e:
-    print(f"\n[ERROR] Connection failed: {e}")
-    print("\nTroubleshooting:")
-    print("1. Check your .env file exists and has DATABASE_URL")
-    print("2. Verify your password in the connection string")
-    print("3. Make sure your Supabase project is active (not paused)")
-    print("4. Check your internet connection")
-    print("5. Verify the hostname in your connection string is correct")
-    print("6. Try accessing your Supabase dashboard to ensure project is running")
+        _say("\n[SUCCESS] All required tables exist!")
+    
+    return True
+
+
+def main() -> int:
+    """
+    Run the connection test and report the result.
+    
+    Returns:
+        Process exit code: 0 if the database is reachable, 1 otherwise
+    """
+    import asyncio
+    from app.env_cache import get_database_url
+
+    # psycopg's async mode can't use the default Proactor event loop on Windows
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    try:
+        database_url = get_database_url()
+        if not database_url:
+            _say("[ERROR] DATABASE_URL not found in .env file")
+            _say_troubleshooting(has_database_url=False)
+            return 1
+        # Shown right away so there's feedback while the connection is attempted
+        print("Testing database connection...", flush=True)
+        if not asyncio.run(check_database(database_url, verbose="--verbose" in sys.argv)):
+            return 1
+        _say("\n[SUCCESS] Everything is working! You can now run the app with:")
+        _say("   uvicorn app.main:app --reload")
+        return 0
+    finally:
+        sys.stdout.write("\n".join(_output) + "\n")
+
 
+if __name__ == "__main__":
+    sys.exit(main())